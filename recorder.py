@@ -20,18 +20,23 @@ Camera handling:
 - Keeps service alive after each recording (never exits on its own)
 """
 
-import os, re, time, signal, threading, http.server, socketserver, subprocess, urllib.parse
+import os, re, time, signal, threading, http.server, subprocess, urllib.parse, json, itertools, queue
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import deque
 import shutil, psutil
-import socket
+import socket, stat
+import io
 from io import BytesIO
 
 # === picamera2 imports ===
 from picamera2 import Picamera2
 from picamera2.encoders import H264Encoder, MJPEGEncoder
 from picamera2.outputs import FileOutput
+try:
+    from picamera2.outputs import PyavOutput   # mp4 fallback when ffmpeg is missing (newer picamera2 + python3-av)
+except ImportError:
+    PyavOutput = None
 from PIL import Image, ImageDraw, ImageFont
 
 HOSTNAME = socket.gethostname()
@@ -44,7 +49,7 @@ CAMERA_CONFIG = {
     "framerate": 15,               # FPS (we set FrameDurationLimits)
     "bitrate": 4_000_000,          # bits per second (single quality knob, used for H.264 encoder)
     "annotation_label": "PICT WittyPi Recorder",
-    "file_extension": ".h264",     # raw H.264 (mp4 wrap optional via ffmpeg)
+    "file_extension": ".h264",     # raw H.264 fallback; muxed live to .mp4 when PyAV or ffmpeg is available
 }
 
 # MODE SWITCH:
@@ -62,24 +67,104 @@ WEB_PORT               = 8123
 
 # ------------- Logging -------------
 LOG_PATH = RECORDINGS_DIR / "recorder.log"
+LOG_ROTATE_BYTES = 512 * 1024   # recorder.log -> recorder.log.1 beyond this size
 LOG_MAX = 1000
-LOG = deque(maxlen=LOG_MAX)
+LOG = deque(maxlen=LOG_MAX)     # (seq, html-escaped line); seq lets /api/logs send only new lines
+_LOG_SEQ = itertools.count(1)
+_log_lock = threading.Lock()
+LOG_QUEUE_MAX = 10000
+LOG_BLOCK_BYTES = 64 * 1024     # writer thread coalesces lines into blocks of up to this size
+LOG_FLUSH_SECONDS = 0.1
+_LOG_Q = queue.Queue(maxsize=LOG_QUEUE_MAX)
+_log_file = {"fh": None, "size": 0, "dropped": 0}
+
+def _write_log_block(data: str):
+    if _log_file["fh"] is None:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _log_file["fh"] = LOG_PATH.open("a")
+        _log_file["size"] = _log_file["fh"].tell()
+    _log_file["fh"].write(data)
+    _log_file["fh"].flush()
+    _log_file["size"] += len(data)
+    if _log_file["size"] >= LOG_ROTATE_BYTES:
+        _log_file["fh"].close()
+        _log_file["fh"] = None
+        os.replace(LOG_PATH, LOG_PATH.with_name(LOG_PATH.name + ".1"))
+
+def _log_writer_thread():
+    """
+    Single consumer of _LOG_Q: batches lines for up to LOG_FLUSH_SECONDS or
+    LOG_BLOCK_BYTES and issues one write() per batch, so a slow SD card never
+    stalls the thread that called log(). A None item flushes and exits.
+    """
+    running = True
+    while running:
+        line = _LOG_Q.get()
+        if line is None:
+            break
+        block = [line]
+        size = len(line)
+        deadline = time.monotonic() + LOG_FLUSH_SECONDS
+        while size < LOG_BLOCK_BYTES:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                line = _LOG_Q.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if line is None:
+                running = False
+                break
+            block.append(line)
+            size += len(line)
+        dropped, _log_file["dropped"] = _log_file["dropped"], 0
+        if dropped:
+            block.append(f"[log] {dropped} line(s) dropped (writer backlog)\n")
+        try:
+            _write_log_block("".join(block))
+        except Exception:
+            pass
+
+def start_log_writer():
+    t = threading.Thread(target=_log_writer_thread, daemon=True)
+    t.start()
+    return t
+
+def stop_log_writer(t: threading.Thread):
+    try:
+        _LOG_Q.put(None, timeout=1.0)
+    except queue.Full:
+        return
+    t.join(timeout=2.0)
+
 def log(msg: str):
     from datetime import datetime as _dt
     ts = _dt.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] {msg}"
     print(line, flush=True)
-    LOG.append(line)
+    with _log_lock:
+        LOG.append((next(_LOG_SEQ), html_escape(line)))  # escaped once here, not per render
     try:
-        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with LOG_PATH.open("a") as f:
-            f.write(line + "\n")
-        with LOG_PATH.open("r+") as f:
-            lines = f.readlines()
-            if len(lines) > LOG_MAX:
-                f.seek(0); f.writelines(lines[-LOG_MAX:]); f.truncate()
-    except Exception:
-        pass
+        _LOG_Q.put_nowait(line + "\n")
+    except queue.Full:
+        _log_file["dropped"] += 1
+
+def logs_since(since: int):
+    """
+    Returns (last_seq, [lines newer than since]).
+    Walks the ring from the newest entry and stops at the first seq <= since,
+    so a client that is up to date costs O(1) instead of copying LOG_MAX lines.
+    """
+    lines = []
+    with _log_lock:
+        last = LOG[-1][0] if LOG else 0
+        for seq, line in reversed(LOG):
+            if seq <= since:
+                break
+            lines.append(line)
+    lines.reverse()
+    return last, lines
 
 # ------------- Global State -------------
 state_lock = threading.Lock()
@@ -96,24 +181,56 @@ stop_requested = threading.Event()
 record_stop_event = threading.Event()
 
 # ------------- Utilities -------------
+# Resolving the local zone via astimezone() re-reads the tz setup on every call;
+# reuse the tzinfo, refreshing it now and then so DST changes are picked up.
+TZ_REFRESH_SECONDS = 600
+_tz_cache = {"tz": None, "until": 0.0}
+
+def _local_tz():
+    now = time.monotonic()
+    if now >= _tz_cache["until"]:
+        _tz_cache["tz"] = datetime.now().astimezone().tzinfo
+        _tz_cache["until"] = now + TZ_REFRESH_SECONDS
+    return _tz_cache["tz"]
+
 def _now_local():
-    return datetime.now().astimezone()
+    return datetime.now(_local_tz())
 
 def _seconds_until(ts: datetime) -> float:
     return (ts - _now_local()).total_seconds()
 
+_found_paths = {}  # candidate tuple -> first existing path; misses are not cached
+
 def _find_existing(paths):
+    # a found WittyPi dir doesn't move at runtime (SIGHUP rescans); a missing
+    # one may be installed later, so misses are probed again on every call
+    key = tuple(paths)
+    hit = _found_paths.get(key)
+    if hit is not None:
+        return hit
     for p in paths:
         if Path(p).exists():
+            _found_paths[key] = Path(p)
             return Path(p)
     return None
 
-def _safe_child_of(path: Path, base: Path) -> bool:
+_RECORDINGS_ROOT = RECORDINGS_DIR.resolve()  # resolved once; the dir never moves
+
+def _recording_path(name: str):
+    """Existing file directly in RECORDINGS_DIR for a bare file name, else None.
+
+    Names with separators, '..', NUL or a leading dot are rejected up front,
+    so the join cannot escape the root and no per-request resolve() is needed.
+    """
+    if (not name or name.startswith(".") or "/" in name or "\\" in name
+            or "\0" in name or ".." in name):
+        return None
+    target = _RECORDINGS_ROOT / name
     try:
-        path.resolve().relative_to(base.resolve())
-        return True
-    except Exception:
-        return False
+        # lstat: a symlink planted in the dir must not lead outside it
+        return target if stat.S_ISREG(target.lstat().st_mode) else None
+    except OSError:
+        return None
 
 def html_escape(s: str) -> str:
     return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
@@ -122,49 +239,68 @@ def build_output_path():
     ts = _now_local().strftime("%Y%m%d_%H%M%S")
     return RECORDINGS_DIR / f"{HOSTNAME}_{ts}{CAMERA_CONFIG['file_extension']}"
 
-def wrap_to_mp4(h264_file: Path):
-    # Optional: wrap to mp4 if ffmpeg is installed
-    try:
-        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-    except Exception:
-        log("ffmpeg not found (or slow); skipping mp4 wrap")
-        return
+# ------------- Witty Pi -------------
+# matched against raw runScript.sh output (bytes); only the timestamp is decoded
+_RE_NEXT_SHUTDOWN = re.compile(rb"next shutdown at:\s*([0-9-]+\s+[0-9:]+)")
+_RE_NEXT_STARTUP  = re.compile(rb"next startup at:\s*([0-9-]+\s+[0-9:]+)")
 
-    fps = CAMERA_CONFIG["framerate"]
-    mp4_file = h264_file.with_suffix(".mp4")
+# runScript.sh forks bash and talks to the RTC; the scheduled shutdown rarely changes.
+NEXT_SHUTDOWN_CACHE_SECONDS = 300
+NEXT_SHUTDOWN_NEAR_SECONDS  = 600    # closer than this -> re-check every CHECK_INTERVAL
+_next_shutdown_cache = {"ts": None, "until": 0.0, "sched_mtime": None}
 
-    try:
-        subprocess.run([
-            "ffmpeg", "-y",
-            "-f", "h264",               # tell ffmpeg the input format
-            "-r", str(fps),             # <-- correct flag for raw h264
-            "-i", str(h264_file),
-            "-c:v", "copy",
-            "-movflags", "+faststart",
-            str(mp4_file)
-        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        log(f"Wrapped {h264_file.name} -> {mp4_file.name}")
-        h264_file.unlink(missing_ok=True)
-    except Exception as e:
-        log(f"MP4 wrap failed: {e}")
+def invalidate_next_shutdown_cache():
+    _next_shutdown_cache["until"] = 0.0
 
+def _schedule_mtime():
+    try:
+        return schedule_path().stat().st_mtime
+    except OSError:
+        return None
 
-# ------------- Witty Pi -------------
 def get_next_shutdown_from_wittypi():
+    """
+    Cached runScript.sh result. Re-queried when the cache expires, when the
+    cached shutdown is within SAFETY_MARGIN_SECONDS or already past, or when
+    schedule.wpi changed on disk (one stat() vs. forking bash).
+    """
+    now = time.monotonic()
+    sched_mtime = _schedule_mtime()
+    cached = _next_shutdown_cache["ts"]
+    if (now < _next_shutdown_cache["until"]
+            and sched_mtime == _next_shutdown_cache["sched_mtime"]
+            and (cached is None or _seconds_until(cached) > SAFETY_MARGIN_SECONDS)):
+        return cached
+    ts = _query_next_shutdown()
+    near = ts is not None and _seconds_until(ts) < NEXT_SHUTDOWN_NEAR_SECONDS
+    _next_shutdown_cache["ts"] = ts
+    _next_shutdown_cache["sched_mtime"] = sched_mtime
+    _next_shutdown_cache["until"] = now + (CHECK_INTERVAL if near else NEXT_SHUTDOWN_CACHE_SECONDS)
+    return ts
+
+def _run_runscript():
+    """
+    runScript.sh output as bytes, or None. Without a schedule.wpi the script
+    only prints a "not found" notice, so don't fork bash (and hit the RTC) then.
+    """
     runscript = _find_existing(RUNSCRIPT_CANDIDATES)
-    if not runscript:
+    if not runscript or not (runscript.parent / "schedule.wpi").exists():
         return None
     try:
-        out = subprocess.check_output(["bash", str(runscript)], stderr=subprocess.STDOUT).decode("utf-8", "ignore")
+        return subprocess.check_output(["bash", str(runscript)], stderr=subprocess.STDOUT)
     except Exception as e:
         log(f"runScript.sh error: {e}")
         return None
-    m = re.search(r"next shutdown at:\s*([0-9-]+\s+[0-9:]+)", out)
+
+def _query_next_shutdown():
+    out = _run_runscript()
+    if out is None:
+        return None
+    m = _RE_NEXT_SHUTDOWN.search(out)
     if not m:
         return None
     try:
-        return datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S").astimezone()
+        return datetime.strptime(m.group(1).decode("ascii"), "%Y-%m-%d %H:%M:%S").astimezone()
     except Exception:
         return None
 
@@ -173,26 +309,20 @@ def get_wittypi_next_times():
     Returns (next_startup_dt, next_shutdown_dt, raw_output) or (None, None, None)
     by parsing wittyPi/runScript.sh output.
     """
-    runscript = _find_existing(RUNSCRIPT_CANDIDATES)
-    if not runscript:
-        return (None, None, None)
-    try:
-        out = subprocess.check_output(["bash", str(runscript)], stderr=subprocess.STDOUT)\
-                        .decode("utf-8", "ignore")
-    except Exception as e:
-        log(f"runScript.sh error: {e}")
+    out = _run_runscript()
+    if out is None:
         return (None, None, None)
 
-    m_up  = re.search(r"next startup at:\s*([0-9-]+\s+[0-9:]+)", out)
-    m_down= re.search(r"next shutdown at:\s*([0-9-]+\s+[0-9:]+)", out)
+    m_up  = _RE_NEXT_STARTUP.search(out)
+    m_down= _RE_NEXT_SHUTDOWN.search(out)
 
-    to_dt = lambda s: datetime.strptime(s, "%Y-%m-%d %H:%M:%S").astimezone()
+    to_dt = lambda b: datetime.strptime(b.decode("ascii"), "%Y-%m-%d %H:%M:%S").astimezone()
     try:
         ns = to_dt(m_up.group(1))   if m_up   else None
         nd = to_dt(m_down.group(1)) if m_down else None
     except Exception:
         ns, nd = None, None
-    return (ns, nd, out)
+    return (ns, nd, out.decode("utf-8", "ignore"))
 
 
 def wittypi_says_off_now():
@@ -208,12 +338,46 @@ def wittypi_says_off_now():
     return None
 
 
+def _write_atomic(path: Path, data: bytes):
+    # WittyPi must never see a half-written schedule.wpi (power can be cut any time)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 def schedule_path():
+    # runScript.sh reads the schedule.wpi next to itself: edit that one when installed
+    runscript = _find_existing(RUNSCRIPT_CANDIDATES)
+    if runscript:
+        return runscript.parent / "schedule.wpi"
     return _find_existing(SCHEDULE_FILE_CANDIDATES) or SCHEDULE_FILE_CANDIDATES[0]
 
-def system_info_html():
+DISK_CACHE_SECONDS = 5
+_disk_cache = {"t": 0.0, "du": None}
+
+def _disk_usage():
+    now = time.monotonic()
+    if _disk_cache["du"] is None or now - _disk_cache["t"] > DISK_CACHE_SECONDS:
+        _disk_cache["du"] = shutil.disk_usage("/")
+        _disk_cache["t"] = now
+    return _disk_cache["du"]
+
+CPU_SAMPLE_SECONDS = 5
+_cpu_cached = {"percent": None}
+
+def _cpu_sampler():
+    """Publishes CPU usage averaged over CPU_SAMPLE_SECONDS; requests never block on psutil."""
+    while not stop_requested.is_set():
+        try:
+            _cpu_cached["percent"] = psutil.cpu_percent(interval=CPU_SAMPLE_SECONDS)
+        except Exception:
+            stop_requested.wait(CPU_SAMPLE_SECONDS)
+
+def system_info():
     try:
-        du = shutil.disk_usage("/")
+        du = _disk_usage()
         disk_str = f"{du.used/1e9:.1f} GB used / {du.total/1e9:.1f} GB total ({100*du.used/du.total:.1f}%)"
     except Exception:
         disk_str = "N/A"
@@ -222,26 +386,134 @@ def system_info_html():
         ram_str = f"{vm.available/1e6:.1f} MB free / {vm.total/1e6:.1f} MB total ({vm.percent}% used)"
     except Exception:
         ram_str = "N/A"
-    try:
-        cpu_str = f"{psutil.cpu_percent(interval=0.5)} %"
-    except Exception:
-        cpu_str = "N/A"
+    cpu = _cpu_cached["percent"]
+    cpu_str = f"{cpu} %" if cpu is not None else "N/A"
     try:
         with open("/sys/class/thermal/thermal_zone0/temp") as f:
             temp_c = int(f.read().strip()) / 1000
         temp_str = f"{temp_c:.1f} °C"
     except Exception:
         temp_str = "N/A"
+    return {"disk": disk_str, "ram": ram_str, "cpu": cpu_str, "temp": temp_str}
 
-    return f"""
-<h3>System Info</h3>
-<table border='1' cellspacing='0' cellpadding='6'>
-<tr><td>Disk</td><td>{disk_str}</td></tr>
-<tr><td>RAM</td><td>{ram_str}</td></tr>
-<tr><td>CPU</td><td>{cpu_str}</td></tr>
-<tr><td>Temp</td><td>{temp_str}</td></tr>
-</table>
-"""
+
+# ------------- Recording output -------------
+_HAS_FFMPEG = shutil.which("ffmpeg") is not None   # probed once, not per recording
+RECORD_BUFFER_SIZE = 1 << 20    # encoder output reaches the SD card in blocks of this size
+RECORD_BACKLOG_MAX = 64 << 20   # frames held in RAM while storage catches up
+RECORD_SYNC_BYTES  = 4 << 20    # raw .h264 only: fdatasync + drop written pages every this many bytes
+
+def _fadvise(fd: int, length: int, advice: str):
+    # posix_fadvise is missing on some platforms; purely advisory either way
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, length, getattr(os, advice))
+        except OSError:
+            pass
+
+class _RecordingFile(io.BufferedIOBase):
+    """
+    Queue between the encoder and storage: a writer thread drains frames into
+    fh, dropping new ones once RECORD_BACKLOG_MAX is queued.
+    With sync=True (a file), also fdatasync + DONTNEED every RECORD_SYNC_BYTES.
+    """
+    def __init__(self, fh, sync: bool = True):
+        self._fh = fh
+        self._sync = sync
+        self._cv = threading.Condition()
+        self._frames = deque()
+        self._pending = 0       # bytes queued or being written
+        self._eof = False
+        self._dropped = 0
+        self._error = None
+        self._written = 0       # bytes handed to fh (writer thread only)
+        self._synced = 0        # ... of which already fdatasync'ed
+        self._writer = threading.Thread(target=self._drain, daemon=True)
+        self._writer.start()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        n = len(b)
+        with self._cv:
+            if self._error is None and self._pending + n <= RECORD_BACKLOG_MAX:
+                self._frames.append(bytes(b))  # encoder may reuse its buffer
+                self._pending += n
+                self._cv.notify()
+                return n
+            self._dropped += 1
+            first_drop = self._error is None and self._dropped == 1
+        if first_drop:
+            log(f"Storage too slow: recording backlog over {RECORD_BACKLOG_MAX >> 20} MB, dropping frames")
+        return n
+
+    def flush(self):
+        pass  # deferred to close()
+
+    def _drain(self):
+        while True:
+            with self._cv:
+                while not self._frames and not self._eof:
+                    self._cv.wait()
+                if not self._frames:
+                    return
+                data = b"".join(self._frames)
+                self._frames.clear()
+            try:
+                self._fh.write(data)
+                self._written += len(data)
+                if self._sync and self._written - self._synced >= RECORD_SYNC_BYTES:
+                    self._fh.flush()
+                    fd = self._fh.fileno()
+                    os.fdatasync(fd)
+                    _fadvise(fd, self._written, "POSIX_FADV_DONTNEED")
+                    self._synced = self._written
+            except Exception as e:
+                with self._cv:
+                    self._error = e
+                    self._frames.clear()
+                    self._pending = 0
+                log(f"Recording write failed: {e}")
+                return
+            with self._cv:
+                self._pending -= len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        with self._cv:
+            self._eof = True
+            self._cv.notify()
+        self._writer.join()
+        try:
+            self._fh.flush()
+            if self._sync:
+                os.fsync(self._fh.fileno())
+        finally:
+            self._fh.close()
+            super().close()
+            if self._dropped:
+                log(f"Recording writer dropped {self._dropped} frame(s)")
+
+def _spawn_mp4_muxer(mp4_path: Path):
+    """
+    ffmpeg reading raw H.264 on stdin and stream-copying it into a fragmented
+    mp4, so no intermediate .h264 file is written and re-read.
+    Fragmented (empty_moov + frag_keyframe) keeps the file playable even if
+    power is cut mid-recording.
+    """
+    fps = CAMERA_CONFIG["framerate"]
+    return subprocess.Popen([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "h264",
+        "-framerate", str(fps),
+        "-i", "pipe:0",
+        "-c:v", "copy",
+        "-f", "mp4",
+        "-movflags", "+frag_keyframe+empty_moov",
+        str(mp4_path)
+    ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, bufsize=RECORD_BUFFER_SIZE)
 
 
 # ------------- Camera Manager (picamera2) -------------
@@ -257,7 +529,10 @@ class CameraManager:
         self.preview_thread = None
         self.preview_stop = threading.Event()
         self.encoder = None
+        self._out = None   # _RecordingFile while recording
+        self._ff = None    # ffmpeg mp4 muxer process while recording
         self._font = None  # Pillow font cache
+        self._overlay = None  # (text, rendered patch) of the last preview overlay
 
     def _ensure_font(self, height):
         if self._font:
@@ -307,7 +582,8 @@ class CameraManager:
                 except Exception as e:
                     last_err = e
                     log(f"Camera open failed (attempt {i}/{attempts}): {e}")
-                    time.sleep(delay)
+                    if i == attempts or stop_requested.wait(delay):
+                        break  # no pointless sleep after the last try, none at all on shutdown
             with state_lock:
                 state["last_error"] = f"Cannot open camera (libcamera busy?): {last_err}"
             return False
@@ -329,24 +605,73 @@ class CameraManager:
                     log("Camera closed")
             except Exception:
                 pass
+            self._close_output()
             self.cam = None
             self.encoder = None
 
     # Recording
+    def _open_output(self, path: Path):
+        """
+        Returns (picamera2 output, path actually written). Preference:
+        1. ffmpeg stdin pipe -> fragmented .mp4 (playable up to the last
+           fragment after a power cut), through the _RecordingFile backlog
+        2. PyavOutput -> .mp4 in-process, only when ffmpeg is missing. Its mp4 is
+           NOT fragmented (index written at close) and it bypasses _RecordingFile
+        3. raw .h264 file, through the _RecordingFile backlog
+        """
+        if _HAS_FFMPEG:
+            mp4_path = path.with_suffix(".mp4")
+            try:
+                self._ff = _spawn_mp4_muxer(mp4_path)
+                self._out = _RecordingFile(self._ff.stdin, sync=False)
+                return FileOutput(self._out), mp4_path
+            except OSError as e:
+                log(f"ffmpeg unavailable ({e}); trying fallbacks")
+        if PyavOutput is not None:
+            mp4_path = path.with_suffix(".mp4")
+            try:
+                return PyavOutput(str(mp4_path), format="mp4"), mp4_path
+            except Exception as e:
+                log(f"PyAV output unavailable ({e})")
+        log(f"No mp4 muxer available; recording raw {path.suffix}")
+        self._out = _RecordingFile(open(str(path), "wb", buffering=RECORD_BUFFER_SIZE))
+        return FileOutput(self._out), path
+
     def start_recording(self, path: Path):
+        """Returns the output path, or None on failure."""
         with self.lock:
             if not self.cam:
-                return False
+                return None
             try:
                 # Ensure video configuration (we might have been in preview previously)
                 self._configure_video(self.cam)
                 # Start camera and encoder
                 self.encoder = H264Encoder(bitrate=CAMERA_CONFIG["bitrate"])
-                self.cam.start_recording(self.encoder, FileOutput(str(path)))
-                return True
+                output, out_path = self._open_output(path)
+                self.cam.start_recording(self.encoder, output)
+                return out_path
             except Exception as e:
                 log(f"start_recording error: {e}")
-                return False
+                self._close_output()
+                return None
+
+    def _close_output(self):
+        # caller holds self.lock
+        if self._out is not None:
+            try:
+                self._out.close()
+            except Exception as e:
+                log(f"Closing recording file failed: {e}")
+            self._out = None
+        if self._ff is not None:
+            try:
+                rc = self._ff.wait(timeout=30)
+                if rc != 0:
+                    log(f"ffmpeg mp4 mux exited with code {rc}")
+            except subprocess.TimeoutExpired:
+                self._ff.kill()
+                log("ffmpeg mp4 mux did not exit; killed")
+            self._ff = None
 
     def stop_recording(self):
         with self.lock:
@@ -355,29 +680,40 @@ class CameraManager:
                     self.cam.stop_recording()
                 except Exception:
                     pass
+            self._close_output()
 
     # ---- MJPEG Preview (no storage) ----
+    def _render_overlay(self, text: str, height: int):
+        font = self._ensure_font(height)
+        # simple black box background
+        margin = 6
+        lines = text.split("\n")
+        # measure
+        probe = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        maxw = 0
+        lh = 0
+        for line in lines:
+            sz = probe.textbbox((0,0), line, font=font)
+            w = sz[2]-sz[0]; h = sz[3]-sz[1]
+            maxw = max(maxw, w); lh = max(lh, h)
+        box_h = lh * len(lines) + margin*2
+        box_w = maxw + margin*2
+        # the box is opaque on RGB frames, so the whole overlay is a pasteable patch
+        patch = Image.new("RGB", (box_w + 1, box_h + 1), (0, 0, 0))
+        draw = ImageDraw.Draw(patch)
+        y = margin
+        for line in lines:
+            draw.text((margin, y), line, fill=(255,255,255), font=font)
+            y += lh
+        return patch
+
     def _draw_annotation(self, im: Image.Image, text: str):
         try:
-            draw = ImageDraw.Draw(im)
-            font = self._ensure_font(im.height)
-            # simple black box background
-            margin = 6
-            lines = text.split("\n")
-            # measure
-            maxw = 0
-            lh = 0
-            for line in lines:
-                sz = draw.textbbox((0,0), line, font=font)
-                w = sz[2]-sz[0]; h = sz[3]-sz[1]
-                maxw = max(maxw, w); lh = max(lh, h)
-            box_h = lh * len(lines) + margin*2
-            box_w = maxw + margin*2
-            draw.rectangle([0, 0, box_w, box_h], fill=(0,0,0,160))
-            y = margin
-            for line in lines:
-                draw.text((margin, y), line, fill=(255,255,255), font=font)
-                y += lh
+            # text changes once a second, frames come ~5x as often: re-render
+            # the patch only when the text differs from the last one drawn
+            if self._overlay is None or self._overlay[0] != text:
+                self._overlay = (text, self._render_overlay(text, im.height))
+            im.paste(self._overlay[1], (0, 0))
         except Exception:
             pass
         return im
@@ -432,17 +768,10 @@ class CameraManager:
         try:
             while not self.preview_stop.is_set():
                 # Remaining time text
-                remaining = 0
                 with state_lock:
-                    if state["record_stop_target"]:
-                        remaining = int(max(0, _seconds_until(state["record_stop_target"])))
-                text = (
-                    f"{CAMERA_CONFIG['annotation_label']} ({HOSTNAME})\n"
-                    f"{_now_local().strftime('%Y-%m-%d %H:%M:%S')} | "
-                    f"{CAMERA_CONFIG['resolution'][0]}x{CAMERA_CONFIG['resolution'][1]} @ "
-                    f"{CAMERA_CONFIG['framerate']}fps | "
-                    f"~{int(CAMERA_CONFIG['bitrate']/1e6)}Mbps | rem {remaining}s"
-                )
+                    stop_target = state["record_stop_target"]
+                remaining = int(max(0, _seconds_until(stop_target))) if stop_target else 0
+                text = annotate(remaining)
 
                 # Grab a JPEG and draw annotation
                 try:
@@ -456,7 +785,8 @@ class CameraManager:
                     log(f"Preview frame/write error: {e}")
                     break  # exit loop on client drop or capture issue
 
-                time.sleep(0.2)
+                if self.preview_stop.wait(0.2):
+                    break
         finally:
             with self.lock:
                 try:
@@ -472,6 +802,7 @@ class CameraManager:
         t = threading.Thread(target=self._mjpeg_streamer, args=(wfile,), daemon=True)
         self.preview_thread = t
         t.start()
+        return t
 
     def stop_preview(self):
         self.preview_stop.set()
@@ -487,26 +818,41 @@ class CameraManager:
 CAM = CameraManager()
 
 # ------------- Recording -------------
+# Overlay text around the two changing fields (time, remaining); config is fixed at runtime
+_OVERLAY_PREFIX = f"{CAMERA_CONFIG['annotation_label']} ({HOSTNAME})\n"
+_OVERLAY_SUFFIX = (
+    f" | {CAMERA_CONFIG['resolution'][0]}x{CAMERA_CONFIG['resolution'][1]} @ "
+    f"{CAMERA_CONFIG['framerate']}fps | "
+    f"~{int(CAMERA_CONFIG['bitrate']/1e6)}Mbps | rem "
+)
+
+_overlay_cache = {"key": None, "text": ""}
+
 def annotate(rem_s: int):
     # (Used only for preview text; we keep this helper for formatting)
-    return (
-        f"{CAMERA_CONFIG['annotation_label']} ({HOSTNAME})\n"
-        f"{_now_local().strftime('%Y-%m-%d %H:%M:%S')} | "
-        f"{CAMERA_CONFIG['resolution'][0]}x{CAMERA_CONFIG['resolution'][1]} @ {CAMERA_CONFIG['framerate']}fps | "
-        f"rem {max(0, rem_s)}s"
-    )
+    # Preview runs at ~5 fps but the text only changes once a second: key on
+    # (epoch second, remaining) and hand back the same str object in between,
+    # so no datetime/strftime/concat garbage is made for the repeated frames.
+    sec = int(time.time())
+    key = (sec, max(0, rem_s))
+    if key != _overlay_cache["key"]:
+        ts = datetime.fromtimestamp(sec, _local_tz()).strftime('%Y-%m-%d %H:%M:%S')
+        _overlay_cache["text"] = f"{_OVERLAY_PREFIX}{ts}{_OVERLAY_SUFFIX}{key[1]}s"
+        _overlay_cache["key"] = key
+    return _overlay_cache["text"]
+
+RECORD_CHECK_SECONDS = 5
 
 def do_record_until(stop_at: datetime):
-    out_path = build_output_path()
-    log(f"Recording -> {out_path.name} (stop at {stop_at.isoformat()})")
     if not CAM.open_with_retry():
         log("Cannot open camera; aborting recording.")
         return
 
-    started = CAM.start_recording(out_path)
-    if not started:
+    out_path = CAM.start_recording(build_output_path())
+    if not out_path:
         log("start_recording failed; aborting.")
         return
+    log(f"Recording -> {out_path.name} (stop at {stop_at.isoformat()})")
 
     with state_lock:
         state["recording"] = True
@@ -514,9 +860,14 @@ def do_record_until(stop_at: datetime):
         state["record_stop_target"] = stop_at
 
     try:
-        while not record_stop_event.is_set() and _seconds_until(stop_at) > 0:
-            # picamera2 doesn't need wait_recording; just sleep
-            time.sleep(1.0)
+        # picamera2 doesn't need wait_recording; park on the stop event.
+        # Stop requests wake us immediately; the timeout only re-checks the deadline.
+        # Monotonic deadline: immune to wall-clock steps (e.g. NTP sync after boot).
+        deadline = time.monotonic() + _seconds_until(stop_at)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or record_stop_event.wait(min(remaining, RECORD_CHECK_SECONDS)):
+                break
     finally:
         CAM.stop_recording()
         with state_lock:
@@ -526,7 +877,9 @@ def do_record_until(stop_at: datetime):
         log("Recording stopped; closing camera.")
         CAM.close()
 
-    wrap_to_mp4(out_path)
+_wittypi_thread = None
+_wittypi_lock = threading.Lock()
+_wittypi_kick = threading.Event()   # wakes the loop early for an immediate re-check
 
 def worker_wittypi_loop():
     while not stop_requested.is_set():
@@ -537,18 +890,28 @@ def worker_wittypi_loop():
             remain = _seconds_until(next_shutdown)
             if remain > SAFETY_MARGIN_SECONDS + 5:
                 stop_at = next_shutdown - timedelta(seconds=SAFETY_MARGIN_SECONDS)
-                # Cap maximum recording duration to 1 hour
+                # Cap maximum recording duration; further away -> check again later
                 max_stop_at = _now_local() + timedelta(seconds=1800)
-                if stop_at > max_stop_at:
+                if stop_at <= max_stop_at:
+                    with state_lock:
+                        state["mode"] = "recording_wittypi"
+                    record_stop_event.clear()
+                    do_record_until(stop_at)
+                    # loop to wait for next schedule again
                     continue
-                    stop_at = max_stop_at
-                with state_lock:
-                    state["mode"] = "recording_wittypi"
-                record_stop_event.clear()
-                do_record_until(stop_at)
-                # loop to wait for next schedule again
-                continue
-        time.sleep(CHECK_INTERVAL)
+        _wittypi_kick.wait(CHECK_INTERVAL)
+        _wittypi_kick.clear()
+
+def start_wittypi_worker():
+    """Starts the WittyPi loop once; if it is already running, just wake it up."""
+    global _wittypi_thread
+    with _wittypi_lock:
+        invalidate_next_shutdown_cache()  # "Re-run WittyPi mode" means: ask runScript.sh again
+        if _wittypi_thread and _wittypi_thread.is_alive():
+            _wittypi_kick.set()
+            return
+        _wittypi_thread = threading.Thread(target=worker_wittypi_loop, daemon=True)
+        _wittypi_thread.start()
 
 
 def worker_duration_once(seconds: int):
@@ -562,21 +925,51 @@ def worker_duration_once(seconds: int):
 def format_bytes(n):
     return f"{n/1048576:.1f} MB"
 
+# Rendered rows keyed on RECORDINGS_DIR's mtime (changes on create/delete/rename).
+# While recording, the growing file's size is refreshed at most every FILES_CACHE_SECONDS.
+FILES_CACHE_SECONDS = 5
+_files_cache = {"mtime": -1, "t": 0.0, "rows": "", "json": b""}
+_FILES_JSON_EMPTY = json.dumps({"mtime": None, "rows": ""}).encode("utf-8")
+
 def list_files_rows():
-    rows = []
-    if not RECORDINGS_DIR.exists():
+    dm = files_mtime()
+    if dm is None:
+        _files_cache.update(mtime=-1, rows="", json=_FILES_JSON_EMPTY)
         return ""
-    for p in sorted(RECORDINGS_DIR.iterdir(), key=lambda x: x.stat().st_mtime if x.exists() else 0, reverse=True):
-        if not p.is_file():
-            continue
-        name = p.name
-        size = format_bytes(p.stat().st_size)
+    with state_lock:
+        rec = state["recording"]
+    now = time.monotonic()
+    if dm == _files_cache["mtime"] and (not rec or now - _files_cache["t"] < FILES_CACHE_SECONDS):
+        return _files_cache["rows"]
+    # scandir: is_file() comes from the dirent, one stat() per file for mtime + size
+    entries = []
+    with os.scandir(RECORDINGS_DIR) as it:
+        for e in it:
+            try:
+                if e.is_file():
+                    st = e.stat()
+                    entries.append((st.st_mtime, e.name, st.st_size))
+            except OSError:
+                continue  # removed while listing
+    entries.sort(reverse=True)
+    rows = []
+    for _, name, size in entries:
+        q = urllib.parse.quote(name)  # once per row, shared by both links
         rows.append(
-            f"<tr><td>{name}</td><td>{size}</td>"
-            f"<td><a href='/download?name={urllib.parse.quote(name)}'>download</a></td>"
-            f"<td><a href='/delete?name={urllib.parse.quote(name)}' onclick=\"return confirm('Delete {name}?')\">delete</a></td></tr>"
+            f"<tr><td>{name}</td><td>{format_bytes(size)}</td>"
+            f"<td><a href='/download?name={q}'>download</a></td>"
+            f"<td><a href='/delete?name={q}' onclick=\"return confirm('Delete {name}?')\">delete</a></td></tr>\n"
         )
-    return "\n".join(rows)
+    rows = "".join(rows)
+    # /api/files body encoded once per rebuild, not once per poll
+    body = json.dumps({"mtime": dm, "rows": rows}).encode("utf-8")
+    _files_cache.update(mtime=dm, t=now, rows=rows, json=body)
+    return rows
+
+def files_json() -> bytes:
+    """Encoded /api/files body; shares list_files_rows()' cache."""
+    list_files_rows()
+    return _files_cache["json"]
 
 def config_table():
     kv = {
@@ -594,60 +987,133 @@ def config_table():
     rows = "\n".join([f"<tr><td>{k}</td><td>{html_escape(str(v))}</td></tr>" for k,v in kv.items()])
     return f"<table border='1' cellspacing='0' cellpadding='6'>{rows}</table>"
 
-def status_panel():
+# Every dashboard polls /api/status once a second; share one stat() of the
+# directory between them for FILES_STAT_SECONDS.
+FILES_STAT_SECONDS = 2
+_files_stat = {"t": -FILES_STAT_SECONDS, "mtime": None}
+
+def invalidate_files_cache():
+    _files_stat["t"] = -FILES_STAT_SECONDS
+    _files_cache["mtime"] = -1
+
+def files_mtime():
+    now = time.monotonic()
+    if now - _files_stat["t"] < FILES_STAT_SECONDS:
+        return _files_stat["mtime"]
+    try:
+        mtime = os.stat(RECORDINGS_DIR).st_mtime
+    except OSError:
+        mtime = None
+    _files_stat.update(t=now, mtime=mtime)
+    return mtime
+
+def status_info():
     with state_lock:
-        m = state["mode"]; rec = state["recording"]; preview = state["preview_on"]
-        stop_target = state["record_stop_target"]; last_err = state["last_error"]
-    rem = ""
-    if stop_target:
-        s = int(max(0, _seconds_until(stop_target)))
-        rem = f" | remaining: {s}s"
-    extras = []
-    if rec: extras.append("recording")
-    if preview: extras.append("preview ON")
-    extras_str = f" ({', '.join(extras)})" if extras else ""
-    err_str = f"<br/><span style='color:#a00;'>Last error: {html_escape(last_err)}</span>" if last_err else ""
-    return f"<p><b>Status:</b> {html_escape(m)}{extras_str}{rem}{err_str}</p>"
-
-def datetime_html():
-    now_str = _now_local().strftime("%Y-%m-%d %H:%M:%S %Z")
-    return f"<h3>System Date & Time</h3><p>{now_str}</p>"
+        snap = dict(state)
+    stop_target = snap["record_stop_target"]
+    rem = int(max(0, _seconds_until(stop_target))) if stop_target else None
+    return {
+        "mode": snap["mode"],
+        "recording": snap["recording"],
+        "preview_on": snap["preview_on"],
+        "remaining": rem,
+        "last_error": snap["last_error"],
+        "now": _now_local().strftime("%Y-%m-%d %H:%M:%S %Z"),
+        "files_mtime": files_mtime(),
+    }
+
+# Rendered editor keyed on (path, mtime); re-read only when schedule.wpi changes
+_sched_cache = {"path": None, "mtime": -1, "html": ""}
+
+def invalidate_schedule_cache():
+    _sched_cache["path"] = None
 
 def schedule_editor_html():
     sp = schedule_path()
     try:
-        body = sp.read_text() if sp.exists() else "# schedule.wpi (create/save)\n"
+        mtime = sp.stat().st_mtime
+    except OSError:
+        mtime = None
+    if _sched_cache["path"] == sp and _sched_cache["mtime"] == mtime:
+        return _sched_cache["html"]
+    try:
+        body = sp.read_text() if mtime is not None else "# schedule.wpi (create/save)\n"
     except Exception as e:
         body = f"# error reading schedule.wpi: {e}\n"
     esc = html_escape(body)
-    return f"""
+    html = f"""
 <h3>schedule.wpi</h3>
 <form method="POST" action="/schedule">
 <textarea name="content" rows="20" cols="100" style="font-family:monospace;">{esc}</textarea><br/>
 <button type="submit">Save</button>
 </form>
 """
+    _sched_cache.update(path=sp, mtime=mtime, html=html)
+    return html
+
+# Dashboard polling: status + new log lines every 1 s, system info every 5 s,
+# recordings list only when RECORDINGS_DIR changes (or periodically while a
+# recording is growing).
+DASHBOARD_JS = """
+let logSeq = 0, filesMtime = null, tick = 0;
+function getJSON(url) { return fetch(url, {cache: "no-store"}).then(r => r.json()); }
+function setText(id, txt) { document.getElementById(id).textContent = txt; }
+
+function refreshFiles() {
+  getJSON("/api/files").then(f => { document.getElementById("files").innerHTML = f.rows; }).catch(() => {});
+}
 
-# ------------- HTTP Server -------------
-class UIHandler(http.server.BaseHTTPRequestHandler):
-    def log_message(self, format, *args):
-        return
+function refreshStatus() {
+  getJSON("/api/status").then(s => {
+    const extras = [];
+    if (s.recording) extras.push("recording");
+    if (s.preview_on) extras.push("preview ON");
+    setText("status", s.mode + (extras.length ? " (" + extras.join(", ") + ")" : "") +
+                      (s.remaining !== null ? " | remaining: " + s.remaining + "s" : ""));
+    setText("last_error", s.last_error ? "Last error: " + s.last_error : "");
+    setText("now", s.now);
+    if (s.files_mtime !== filesMtime || (s.recording && tick % 10 === 0)) {
+      filesMtime = s.files_mtime;
+      refreshFiles();
+    }
+  }).catch(() => {});
+}
 
-    def _send_html(self, html):
-        data = html.encode("utf-8")
-        self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+function refreshLogs() {
+  getJSON("/api/logs?since=" + logSeq).then(l => {
+    const pre = document.getElementById("logs");
+    if (l.seq < logSeq) { pre.textContent = ""; logSeq = 0; return; }  // recorder restarted
+    logSeq = l.seq;
+    if (!l.lines.length) return;
+    const atBottom = pre.scrollTop + pre.clientHeight >= pre.scrollHeight - 4;
+    for (const line of l.lines) pre.insertAdjacentHTML("beforeend", line + "\\n");  // lines arrive pre-escaped
+    while (pre.childNodes.length > LOG_MAX) pre.removeChild(pre.firstChild);
+    if (atBottom) pre.scrollTop = pre.scrollHeight;
+  }).catch(() => {});
+}
 
-    def do_GET(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
+function refreshSysinfo() {
+  getJSON("/api/sysinfo").then(i => {
+    setText("sys_disk", i.disk); setText("sys_ram", i.ram);
+    setText("sys_cpu", i.cpu); setText("sys_temp", i.temp);
+  }).catch(() => {});
+}
 
-        if path == "/":
-            logs_text = html_escape("\n".join(LOG))
-            page = f"""
+function poll() {
+  refreshStatus(); refreshLogs();
+  if (tick % 5 === 0) refreshSysinfo();
+  tick++;
+}
+poll();
+setInterval(poll, 1000);
+"""
+
+def _render_shell():
+    """
+    Static dashboard page. Everything that changes (status, logs, files,
+    system info) is fetched by DASHBOARD_JS from the /api/* endpoints.
+    """
+    return f"""
 <html>
 <head>
 <meta charset="utf-8">
@@ -655,8 +1121,8 @@ class UIHandler(http.server.BaseHTTPRequestHandler):
 </head>
 <body>
 <h2>PICT Recorder</h2>
-{status_panel()}
-{datetime_html()}
+<p><b>Status:</b> <span id="status">…</span><br/><span id="last_error" style='color:#a00;'></span></p>
+<h3>System Date & Time</h3><p id="now"></p>
 
 <h3>Controls</h3>
 <form method="POST" action="/start_duration" style="margin-bottom:8px;">
@@ -673,56 +1139,168 @@ Start duration (1..3600 s): <input name="seconds" size="8"/>
 
 <h3>Configuration</h3>
 {config_table()}
-{system_info_html()}
+
+<h3>System Info</h3>
+<table border='1' cellspacing='0' cellpadding='6'>
+<tr><td>Disk</td><td id="sys_disk"></td></tr>
+<tr><td>RAM</td><td id="sys_ram"></td></tr>
+<tr><td>CPU</td><td id="sys_cpu"></td></tr>
+<tr><td>Temp</td><td id="sys_temp"></td></tr>
+</table>
 
 <h3>Recordings</h3>
 <table border="1" cellspacing="0" cellpadding="6">
-<tr><th>File</th><th>Size</th><th>Download</th><th>Delete</th></tr>
-{list_files_rows()}
+<thead><tr><th>File</th><th>Size</th><th>Download</th><th>Delete</th></tr></thead>
+<tbody id="files"></tbody>
 </table>
 
-{schedule_editor_html()}
+<h3>schedule.wpi</h3>
+<p><a href="/schedule">View / edit schedule.wpi</a></p>
 
 <h3>Logs (latest)</h3>
-<pre style="background:#111;color:#0f0;padding:8px;max-height:360px;overflow-y:auto;white-space:pre;">{logs_text}</pre>
+<pre id="logs" style="background:#111;color:#0f0;padding:8px;max-height:360px;overflow-y:auto;white-space:pre;"></pre>
+<script>const LOG_MAX = {LOG_MAX};</script>
+<script>{DASHBOARD_JS}</script>
 </body></html>
 """
-            self._send_html(page)
+
+_INDEX_HTML = _render_shell().encode("utf-8")
+
+# ------------- HTTP Server -------------
+KEEPALIVE_SECONDS = 30     # idle keep-alive connection timeout
+MAX_FORM_BYTES  = 256 * 1024 # POST bodies (schedule.wpi is a few KB)
+MAX_DOWNLOADS   = 4         # concurrent /download streams; more would thrash the SD card
+_download_slots = threading.BoundedSemaphore(MAX_DOWNLOADS)
+
+class UIHandler(http.server.BaseHTTPRequestHandler):
+    # keep-alive: the dashboard's 1 s polls reuse one connection (and one
+    # server thread) instead of a TCP handshake + thread spawn per request.
+    # Every response must therefore carry Content-Length or close.
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_SECONDS  # reap idle keep-alive connections
+
+    def log_message(self, format, *args):
+        return
+
+    def _redirect(self, location: str):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_bytes(self, data: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_html(self, html):
+        self._send_bytes(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send_file(self, target: Path):
+        sock = self.connection
+        with target.open("rb") as f:
+            fs = os.fstat(f.fileno())
+            _fadvise(f.fileno(), fs.st_size, "POSIX_FADV_SEQUENTIAL")  # deeper readahead
+            # no SO_SNDBUF here: setting it turns off send-buffer autotuning, and
+            # Raspberry Pi OS's wmem_max would pin it far below tcp_wmem[2]
+            # cork: headers and the first file pages leave in full-sized segments
+            cork = hasattr(socket, "TCP_CORK")
+            if cork:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Disposition", f'attachment; filename="{target.name}"')
+                self.send_header("Content-Length", str(fs.st_size))
+                self.end_headers()
+                self.wfile.flush()
+                # zero-copy via os.sendfile; socket.sendfile falls back to a send() loop itself
+                sock.sendfile(f, 0, fs.st_size)
+            finally:
+                if cork:
+                    try:
+                        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+                    except OSError:
+                        pass
+                # served pages won't be read again; don't let them evict the recorder's
+                _fadvise(f.fileno(), fs.st_size, "POSIX_FADV_DONTNEED")
+
+    def _send_json(self, obj):
+        self._send_json_bytes(json.dumps(obj).encode("utf-8"))
+
+    def _send_json_bytes(self, data: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        path = parsed.path
+
+        if path == "/":
+            self._send_bytes(_INDEX_HTML, "text/html; charset=utf-8")
+            return
+
+        if path == "/api/status":
+            self._send_json(status_info())
+            return
+
+        if path == "/api/sysinfo":
+            self._send_json(system_info())
+            return
+
+        if path == "/api/files":
+            self._send_json_bytes(files_json())
+            return
+
+        if path == "/api/logs":
+            qs = urllib.parse.parse_qs(parsed.query)
+            try:
+                since = int(qs.get("since", ["0"])[0])
+            except ValueError:
+                since = 0
+            last, lines = logs_since(since)
+            self._send_json({"seq": last, "lines": lines})
             return
 
         if path == "/download":
             qs = urllib.parse.parse_qs(parsed.query)
             name = qs.get("name", [""])[0]
-            target = (RECORDINGS_DIR / name).resolve()
-            if not name or not target.exists() or not _safe_child_of(target, RECORDINGS_DIR):
+            target = _recording_path(name)
+            if target is None:
                 self.send_error(404, "File not found")
                 return
-            try:
-                fs = target.stat()
-                self.send_response(200)
-                self.send_header("Content-Type", "application/octet-stream")
-                self.send_header("Content-Disposition", f'attachment; filename="{target.name}"')
-                self.send_header("Content-Length", str(fs.st_size))
+            if not _download_slots.acquire(blocking=False):
+                self.send_response(503)
+                self.send_header("Retry-After", "10")
+                self.send_header("Content-Length", "0")
                 self.end_headers()
-                with target.open("rb") as f:
-                    while True:
-                        chunk = f.read(64*1024)
-                        if not chunk: break
-                        self.wfile.write(chunk)
+                return
+            try:
+                self._send_file(target)
             except Exception as e:
+                self.close_connection = True  # response may be half-sent
                 self.send_error(500, f"Error sending file: {e}")
+            finally:
+                _download_slots.release()
             return
 
         if path == "/delete":
             qs = urllib.parse.parse_qs(parsed.query)
             name = qs.get("name", [""])[0]
-            target = (RECORDINGS_DIR / name).resolve()
-            if not name or not target.exists() or not _safe_child_of(target, RECORDINGS_DIR):
+            target = _recording_path(name)
+            if target is None:
                 self.send_error(404, "File not found")
                 return
             try:
                 target.unlink()
-                self.send_response(302); self.send_header("Location", "/"); self.end_headers()
+                invalidate_files_cache()
+                self._redirect("/")
             except Exception as e:
                 self.send_error(500, f"Delete failed: {e}")
             return
@@ -737,12 +1315,12 @@ Start duration (1..3600 s): <input name="seconds" size="8"/>
             self.send_header("Cache-Control", "no-cache, private")
             self.send_header("Pragma", "no-cache")
             self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=FRAME")
+            self.send_header("Connection", "close")  # unbounded body
             self.end_headers()
+            self.close_connection = True
             try:
-                CAM.start_preview(self.wfile)
-                # stay alive only while the preview thread is alive
-                while CAM.preview_thread and CAM.preview_thread.is_alive():
-                    time.sleep(0.25)
+                # park until the streamer exits (client drop, capture error or stop_preview)
+                CAM.start_preview(self.wfile).join()
             finally:
                 CAM.stop_preview()  # safe even if already stopped
             return
@@ -755,29 +1333,44 @@ Start duration (1..3600 s): <input name="seconds" size="8"/>
 
         self.send_error(404, "Not found")
 
+    def _read_form(self):
+        """Parsed urlencoded body, or None after sending 400/413."""
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            self.send_error(400, "Bad Content-Length")
+            return None
+        if length > MAX_FORM_BYTES:
+            self.send_error(413, f"Form body over {MAX_FORM_BYTES} bytes")
+            self.close_connection = True  # body left unread
+            return None
+        body = self.rfile.read(max(0, length)).decode("utf-8", "ignore")
+        return urllib.parse.parse_qs(body)
+
     def do_POST(self):
         parsed = urllib.parse.urlparse(self.path)
         path = parsed.path
+        # always consume the body: under keep-alive any unread bytes would be
+        # parsed as the start of the next request on this connection
+        fields = self._read_form()
+        if fields is None:
+            return
 
         if path == "/schedule":
-            length = int(self.headers.get("Content-Length", "0"))
-            body = self.rfile.read(length).decode("utf-8", "ignore")
-            fields = urllib.parse.parse_qs(body)
             content = fields.get("content", [""])[0]
             sp = schedule_path()
             try:
                 sp.parent.mkdir(parents=True, exist_ok=True)
-                sp.write_text(content)
+                _write_atomic(sp, content.encode("utf-8"))
+                invalidate_next_shutdown_cache()
+                invalidate_schedule_cache()
                 log("schedule.wpi saved")
-                self.send_response(302); self.send_header("Location", "/schedule"); self.end_headers()
+                self._redirect("/schedule")
             except Exception as e:
                 self.send_error(500, f"Saving schedule failed: {e}")
             return
 
         if path == "/start_duration":
-            length = int(self.headers.get("Content-Length", "0"))
-            body = self.rfile.read(length).decode("utf-8", "ignore")
-            fields = urllib.parse.parse_qs(body)
             sec_str = fields.get("seconds", [""])[0].strip()
             try:
                 sec = int(sec_str)
@@ -792,7 +1385,7 @@ Start duration (1..3600 s): <input name="seconds" size="8"/>
                     self.send_error(409, "Already recording")
                 else:
                     threading.Thread(target=worker_duration_once, args=(sec,), daemon=True).start()
-                    self.send_response(302); self.send_header("Location", "/"); self.end_headers()
+                    self._redirect("/")
             return
 
         if path == "/start_wittypi":
@@ -801,28 +1394,34 @@ Start duration (1..3600 s): <input name="seconds" size="8"/>
             if already:
                 self.send_error(409, "Already recording")
             else:
-                threading.Thread(target=worker_wittypi_loop, daemon=True).start()
-                self.send_response(302); self.send_header("Location", "/"); self.end_headers()
+                start_wittypi_worker()
+                self._redirect("/")
             return
 
         if path == "/stop":
             with state_lock:
                 already = state["recording"]
             if not already:
-                self.send_response(302); self.send_header("Location", "/"); self.end_headers()
+                self._redirect("/")
             else:
                 record_stop_event.set()
-                self.send_response(302); self.send_header("Location", "/"); self.end_headers()
+                self._redirect("/")
             return
 
         self.send_error(404, "Unknown POST")
 
-def serve_http():
-    class ThreadedHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-        allow_reuse_address = True
-        daemon_threads = True  # auto-clean worker threads on client drop
+class UIServer(http.server.ThreadingHTTPServer):
+    """
+    One thread per connection, so a long /download or /preview never blocks
+    status polling or the Stop button.
+    """
+    allow_reuse_address = True
+    daemon_threads = True    # auto-clean worker threads on client drop
+    block_on_close = False   # don't join streaming clients on shutdown
+    request_queue_size = 32  # dashboard polls + preview + downloads can burst past the default 5
 
-    with ThreadedHTTPServer(("", WEB_PORT), UIHandler) as httpd:
+def serve_http():
+    with UIServer(("", WEB_PORT), UIHandler) as httpd:
         log(f"HTTP server at http://0.0.0.0:{WEB_PORT}/ (serving {RECORDINGS_DIR})")
         try:
             httpd.serve_forever()
@@ -837,27 +1436,43 @@ def apply_low_power_settings():
 def main():
     apply_low_power_settings()
     RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+    log_writer = start_log_writer()
     log("PICT recorder (picamera2) starting...")
+    threading.Thread(target=_cpu_sampler, daemon=True).start()
     threading.Thread(target=serve_http, daemon=True).start()
 
     if isinstance(DURATION_SECONDS, int) and 1 <= DURATION_SECONDS <= 3600:
         threading.Thread(target=worker_duration_once, args=(DURATION_SECONDS,), daemon=True).start()
     else:
-        threading.Thread(target=worker_wittypi_loop, daemon=True).start()
+        start_wittypi_worker()
 
     try:
-        while not stop_requested.is_set():
-            time.sleep(1)
+        # lock waits are signal-interruptible: _on_signal runs here and sets the event
+        stop_requested.wait()
     except KeyboardInterrupt:
         pass
     log("PICT recorder exiting...")
+    # workers are daemons: drain, flush and fsync any open recording before the
+    # interpreter exits (both take CAM.lock, so they also wait out a worker's own close)
+    CAM.stop_recording()
+    CAM.close()
+    stop_log_writer(log_writer)
 
 def _on_signal(signum, frame):
     stop_requested.set()
     record_stop_event.set()
+    _wittypi_kick.set()  # wake the WittyPi loop out of its CHECK_INTERVAL wait
+
+def _on_sighup(signum, frame):
+    # `systemctl kill -s HUP pict-recorder` : drop cached WittyPi/schedule state
+    _found_paths.clear()
+    invalidate_next_shutdown_cache()
+    invalidate_schedule_cache()
+    _wittypi_kick.set()
 
 signal.signal(signal.SIGTERM, _on_signal)
 signal.signal(signal.SIGINT, _on_signal)
+signal.signal(signal.SIGHUP, _on_sighup)
 
 if __name__ == "__main__":
     main()